@@ -1,10 +1,18 @@
-import os
+import io
+import sys
 import pandas as pd
 
+# rows formatted per write and the file buffer size used when streaming the kml to disk
+KML_CHUNK_ROWS = 10_000
+KML_WRITE_BUFFER = 1024 * 1024
+
+# positional columns written to the kml coordinates, in kml order
+KML_COLUMNS = ['Long', 'Lat', 'Z']
+
 # TODO: can we have wind speed, temp as attributes or even color the kml in segments based on the windspeed?
 
 
-def aimms_to_kml(weather_df, kml_file):
+def aimms_to_kml(weather_df, kml_file, coordinate_precision=7, altitude_precision=3):
     """ Writes the positional information from a weather data file to a kml. Useful for cross referencing against
     the sensor trajectory to identify potential areas of missed weather coverage.
 
@@ -15,11 +23,31 @@ def aimms_to_kml(weather_df, kml_file):
     kml_file : str
         An output file to write the kml data to.
 
+    Optional Parameters
+    ----------
+    coordinate_precision : int
+        Decimal places kept for longitude and latitude. Defaults to 7 (around 1 cm). Use None for full precision.
+    altitude_precision : int
+        Decimal places kept for altitude. Defaults to 3. Use None for full precision.
+
     """
 
-    df_kml = weather_df.iloc[::10, :]
+    # only the positional columns are needed, select them before thinning the data
+    missing_columns = [column for column in KML_COLUMNS if column not in weather_df.columns]
+    if missing_columns:
+        sys.exit(f"Weather data is missing {missing_columns} column(s) needed for the kml.")
+    df_kml = weather_df.loc[:, KML_COLUMNS].iloc[::10]
+
+    # trim the written digits, full float precision roughly doubles the size of the kml
+    decimals = {}
+    if coordinate_precision is not None:
+        decimals.update({'Long': coordinate_precision, 'Lat': coordinate_precision})
+    if altitude_precision is not None:
+        decimals['Z'] = altitude_precision
+    if decimals:
+        df_kml = df_kml.round(decimals)
 
-    kml_text = '''<?xml version="1.0" encoding="UTF-8"?>
+    header_kml = '''<?xml version="1.0" encoding="UTF-8"?>
 <kml xmlns="http://www.opengis.net/kml/2.2" xmlns:gx="http://www.google.com/kml/ext/2.2" xmlns:kml="http://www.opengis.net/kml/2.2" xmlns:atom="http://www.w3.org/2005/Atom">
 <Document>
     <Style id="sn_ylw-pushpin">
@@ -61,17 +89,37 @@ def aimms_to_kml(weather_df, kml_file):
             <altitudeMode>absolute</altitudeMode>
             <coordinates>
 '''
-    # iterates through the subsampled dataframe and writes values to the kml coordinates
-    for index, row in df_kml.iterrows():
-        kml_text += '\t\t\t\t' + str(row['Long']) + ',' + str(row['Lat']) + ',' + str(row['Z']) + '\n'
 
     ## complete the kml footer
-    kml_text += '''         </coordinates>
+    footer_kml = '''         </coordinates>
         </LineString>
     </Placemark>
 </Document>
 </kml>'''
 
-    # create a kml file and dump the subsampled kml data to it
-    with open(os.path.join(kml_file), 'w') as f:
-        f.write(kml_text)
\ No newline at end of file
+    # stream the kml to disk so the full document is never held in memory
+    with open(kml_file, 'w', buffering=KML_WRITE_BUFFER) as f:
+        f.write(header_kml)
+        for start in range(0, len(df_kml.index), KML_CHUNK_ROWS):
+            f.write(format_coordinates(df_kml.iloc[start:start + KML_CHUNK_ROWS]))
+        f.write(footer_kml)
+
+
+def format_coordinates(df_kml):
+    """ Formats the positional information of a weather dataframe as indented kml coordinate lines.
+
+    Required Parameters
+    ----------
+    df_kml : dataframe
+        A weather data pandas dataframe with 'Long', 'Lat' and 'Z' columns.
+
+    Returns
+    -------
+    str
+        One 'long,lat,z' line per row of the dataframe.
+    """
+    # let the pandas csv writer format the coordinate lines, then indent every line at once.
+    # the trailing slice drops the indent added after the final newline (and leaves an empty frame empty)
+    buf = io.StringIO()
+    df_kml.to_csv(buf, columns=KML_COLUMNS, header=False, index=False, sep=',', lineterminator='\n')
+    return ('\t\t\t\t' + buf.getvalue().replace('\n', '\n\t\t\t\t'))[:-4]
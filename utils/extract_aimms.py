@@ -2,6 +2,11 @@ import os
 import sys
 import shutil
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# larger buffer for copies that can't use the platform zero-copy path (eg some network filesystems)
+shutil.COPY_BUFSIZE = max(shutil.COPY_BUFSIZE, 1024 * 1024)
 
 
 def extract_aimms(aimms_file,
@@ -11,6 +16,9 @@ def extract_aimms(aimms_file,
     """ Extracts aimms data from weather probe using
     custom executables supplied by the manufacturer.
 
+    The executables need the raw file next to them, so the raw file is hard linked into the
+    processing directory. If that fails a symlink is tried, and only then is the file copied.
+
     Required Parameters
     ----------
     aimms_file : str
@@ -34,66 +42,171 @@ def extract_aimms(aimms_file,
 
     # the executables tend to only work when the input parameter and data files are in the same directory
     file_name = os.path.basename(aimms_file)
-    shutil.copy(aimms_file, exe_dir)
+    src_in_exe_dir = os.path.join(exe_dir, file_name)
+    link_or_copy(aimms_file, src_in_exe_dir)
 
-    # the output is created in the same directory as the exe
-    out_file_name = os.path.splitext(file_name)[0] + "_extract.out"
-    out_file_path = os.path.join(exe_dir, out_file_name)
+    try:
+        # the output is created in the same directory as the exe
+        out_file_name = os.path.splitext(file_name)[0] + "_extract.out"
+        out_file_path = os.path.join(exe_dir, out_file_name)
 
-    print(f"\nExtracting file {aimms_file}")
-    print(f"Using directory {exe_dir}")
-    print(f"Using extraction tool {weather_exe}")
+        print(f"\nExtracting file {aimms_file}")
+        print(f"Using directory {exe_dir}")
+        print(f"Using extraction tool {weather_exe}")
 
-    try:
-        if weather_exe == "ekf560A30.exe":
-            args = [r"ekf560A30.exe",
-                    r"ekf560A30_param.dat",
-                    file_name,
-                    "-c", "on",
-                    "-f", "on",
-                    "-t", "on",
-                    "-w", "on",
-                    "-o", out_file_name]
-        elif weather_exe == "ekf612A30.exe":
-            args = [r"ekf612A30.exe",
-                    r"ekf612A30_param.dat",
-                    file_name,
-                    "-c", "on",
-                    "-f", "on",
-                    "-t", "on",
-                    "-w", "on",
-                    "-o", out_file_name]
-        elif weather_exe == "canextr4_ssii.exe":
-            args = [r"canextr4_ssii.exe",
-                    file_name,
-                    out_file_name]
-        else:
-            sys.exit(f"Weather_exe {weather_exe} not recognized!")
-
-        # run the executable as a subprocess
-        subprocess.run(args, cwd=exe_dir, shell=True)
-
-    except Exception as e:
-        raise e
-
-    # copy the output file to the input aimms directory or a new directory
-    try:
-        if out_dir:
-            out_file_copy = os.path.join(out_dir, out_file_name)
-        else:
-            out_file_copy = os.path.join(os.path.dirname(aimms_file), out_file_name)
-        shutil.move(out_file_path, out_file_copy)
-    except Exception as e:
-        raise e
-
-    # delete the raw data file from the exe dir
-    try:
-        os.remove(os.path.join(exe_dir, file_name))
-    except Exception as e:
-        print(e)
+        try:
+            if weather_exe == "ekf560A30.exe":
+                args = [r"ekf560A30.exe",
+                        r"ekf560A30_param.dat",
+                        file_name,
+                        "-c", "on",
+                        "-f", "on",
+                        "-t", "on",
+                        "-w", "on",
+                        "-o", out_file_name]
+            elif weather_exe == "ekf612A30.exe":
+                args = [r"ekf612A30.exe",
+                        r"ekf612A30_param.dat",
+                        file_name,
+                        "-c", "on",
+                        "-f", "on",
+                        "-t", "on",
+                        "-w", "on",
+                        "-o", out_file_name]
+            elif weather_exe == "canextr4_ssii.exe":
+                args = [r"canextr4_ssii.exe",
+                        file_name,
+                        out_file_name]
+            else:
+                sys.exit(f"Weather_exe {weather_exe} not recognized!")
 
-    # check if the output is empty which can happen if the exe is not compatible with the raw data file
-    if os.path.getsize(out_file_copy) == 0:
+            # run the executable directly as a subprocess, a non-zero exit raises a CalledProcessError.
+            # its output isn't captured so the tool's own messages still reach the console
+            args[0] = os.path.join(exe_dir, args[0])
+            subprocess.run(args, cwd=exe_dir, shell=False, check=True)
+
+        except Exception as e:
+            raise e
+
+        # copy the output file to the input aimms directory or a new directory
+        try:
+            if out_dir:
+                out_file_copy = os.path.join(out_dir, out_file_name)
+            else:
+                out_file_copy = os.path.join(os.path.dirname(aimms_file), out_file_name)
+            move_file(out_file_path, out_file_copy)
+        except Exception as e:
+            raise e
+    finally:
+        # delete the raw data file from the exe dir, also when the extraction failed so a rerun isn't blocked
+        try:
+            os.remove(src_in_exe_dir)
+        except Exception as e:
+            print(e)
+
+    # check if the output is empty which can happen if the exe is not compatible with the raw data file,
+    # some of the executables still exit cleanly in that case so the return code alone isn't enough.
+    # reading the first byte also starts pulling the file into the page cache for the parser
+    with open(out_file_copy, 'rb') as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        first_byte = f.read(1)
+    if not first_byte:
         sys.exit("Output file is empty, weather extraction failed.")
 
     return out_file_copy
+
+
+def extract_aimms_batch(aimms_files,
+                        out_dir=None,
+                        exe_dir=r"C:\Scripts\pdx_bridge\tasks\aimms_weather",
+                        weather_exe="ekf560A30.exe",
+                        max_workers=None):
+    """ Extracts several aimms files in parallel.
+
+    Each extraction runs in its own temporary copy of the processing directory so that
+    the executables never share input or output files.
+
+    Required Parameters
+    ----------
+    aimms_files : list[str]
+        Paths to raw aventech weather probe data files
+
+    Optional Parameters
+    ----------
+    out_dir : str
+        The output location. Defaults to the directory of each input aimms file.
+    exe_dir : str
+        The processing directory containing the weather executable files and parameter files.
+        Defaults to the bridge repo.
+    weather_exe : str
+        The executable to use, which can depend on the specific probe utilized. Defaults to ekf560A30.exe.
+    max_workers : int
+        The maximum number of extractions to run at once. Defaults to the ThreadPoolExecutor default.
+
+    Returns
+    -------
+    list[str]
+        The extracted meteorological data files, in the same order as the input files.
+    """
+    # the executable and its parameter file are all a worker needs from the processing directory
+    exe_files = [weather_exe, os.path.splitext(weather_exe)[0] + "_param.dat"]
+
+    def extract_in_tempdir(aimms_file):
+        work_dir = tempfile.mkdtemp(dir=exe_dir)
+        try:
+            for exe_file in exe_files:
+                if os.path.isfile(os.path.join(exe_dir, exe_file)):
+                    shutil.copy(os.path.join(exe_dir, exe_file), work_dir)
+            return extract_aimms(aimms_file, out_dir=out_dir, exe_dir=work_dir, weather_exe=weather_exe)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(extract_in_tempdir, aimms_files))
+
+
+def link_or_copy(src, dst):
+    """ Places a file at a new path without copying its data when possible.
+
+    Tries a hard link first, then a symlink (which can require admin rights on older Windows),
+    and falls back to shutil.copyfile if neither can be created.
+
+    Required Parameters
+    ----------
+    src : str
+        The existing file.
+    dst : str
+        The new file path.
+    """
+    # a file left at dst (eg by a failed earlier run) would make every option below fail
+    if os.path.lexists(dst) and os.path.abspath(dst) != os.path.abspath(src):
+        os.remove(dst)
+
+    try:
+        os.link(src, dst)
+    except OSError:
+        try:
+            os.symlink(os.path.abspath(src), dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+
+
+def move_file(src, dst):
+    """ Moves a file, renaming in place when possible.
+
+    A rename on the same filesystem moves no data. Across filesystems
+    the file is copied with shutil.copyfile, which uses the platform fast copy, and the source is removed.
+
+    Required Parameters
+    ----------
+    src : str
+        The file to move.
+    dst : str
+        The destination file path.
+    """
+    try:
+        os.replace(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+        os.remove(src)
@@ -1,7 +1,8 @@
 import argparse
 import sys
+import threading
 
-from gooey import *
+from gooey import Gooey, GooeyParser
 from gooey.python_bindings.gooey_decorator import IGNORE_COMMAND
 
 
@@ -9,25 +10,47 @@ def is_gooey_wrapped():
     return IGNORE_COMMAND in sys.argv
 
 
+# checked once at import, IGNORE_COMMAND is removed from sys.argv later on
 wrapped_args = is_gooey_wrapped()
 
 
-class UnbufferedStream:
+class LineBufferedStream:
     # https://stackoverflow.com/questions/107705/disable-output-buffering
+    # output is line buffered: writes are collected and flushed at each newline,
+    # once buffer_size characters are pending, or when flush() is called (eg by tqdm).
+    # the pending buffer is shared by every thread writing to stdout/stderr, so it is only touched under a lock
 
-    def __init__(self, stream, force_newline=False):
+    def __init__(self, stream, force_newline=False, buffer_size=4096):
         self.stream = stream
         self.force_newline = force_newline
+        self.buffer_size = buffer_size
+        self._pending = []
+        self._pending_size = 0
+        self._lock = threading.RLock()
+        # bound once, these are called for every flushed line
+        self._write = stream.write
+        self._flush = stream.flush
 
     def write(self, data):
-        data = self.format_string(data)
-        self.stream.write(data)
-        self.stream.flush()
+        self._buffer(self.format_string(data))
 
     def writelines(self, datas):
-        datas = (self.format_string(data) for data in datas)
-        self.stream.writelines(datas)
-        self.stream.flush()
+        self._buffer(''.join(self.format_string(data) for data in datas))
+
+    def flush(self):
+        with self._lock:
+            if self._pending:
+                self._write(''.join(self._pending))
+                self._pending = []
+                self._pending_size = 0
+            self._flush()
+
+    def _buffer(self, data):
+        with self._lock:
+            self._pending.append(data)
+            self._pending_size += len(data)
+            if '\n' in data or self._pending_size >= self.buffer_size:
+                self.flush()
 
     def format_string(self, data):
         if self.force_newline:
@@ -40,6 +63,10 @@ class UnbufferedStream:
         return getattr(self.stream, attr)
 
 
+# the previous name, kept for bridge scripts that import it
+UnbufferedStream = LineBufferedStream
+
+
 class StoreMultiFileArgument(argparse.Action):
     def __call__(self, parser, namespace, values, option_string=None):
         if wrapped_args:
@@ -57,13 +84,13 @@ def gooey_on_empty_args(ignore_gooey=False, *args, **kwargs):
     if ignore_gooey:
         return wrap_outer
     elif sys.argv[1:]:
-        if is_gooey_wrapped():
+        if wrapped_args:
             sys.argv.remove(IGNORE_COMMAND)
         return wrap_outer
 
     return Gooey(*args, **kwargs)
 
 
-sys.stdout = UnbufferedStream(sys.stdout)
-sys.stderr = UnbufferedStream(sys.stderr)
-tqdm_stream = UnbufferedStream(sys.stdout, force_newline=is_gooey_wrapped())
\ No newline at end of file
+sys.stdout = LineBufferedStream(sys.stdout)
+sys.stderr = LineBufferedStream(sys.stderr)
+tqdm_stream = LineBufferedStream(sys.stdout, force_newline=wrapped_args)
\ No newline at end of file
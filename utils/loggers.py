@@ -1,9 +1,21 @@
 import logging
 
 # log string formats
-LOGFILE_FORMAT = "%(asctime)s -- %(levelname)s -- %(name)s -- %(message)s -- module:%(module)s -- function:%(module)s"
+LOGFILE_FORMAT = "%(asctime)s -- %(levelname)s -- %(name)s -- %(message)s -- module:%(module)s -- function:%(funcName)s"
 CONSOLE_FORMAT = "%(asctime)s -- %(levelname)s -- %(name)s -- %(message)s"
 PRINT_FORMAT = "%(message)s"
+
+# formatters are shared by every logger instead of being rebuilt per logger
+LOGFILE_FORMATTER = logging.Formatter(LOGFILE_FORMAT)
+CONSOLE_FORMATTER = logging.Formatter(CONSOLE_FORMAT)
+PRINT_FORMATTER = logging.Formatter(PRINT_FORMAT)
+
+# log level names accepted by the handlers, anything else is treated as WARNING
+LOG_LEVELS = {"DEBUG": logging.DEBUG,
+              "INFO": logging.INFO,
+              "WARNING": logging.WARNING,
+              "ERROR": logging.ERROR,
+              "CRITICAL": logging.CRITICAL}
 # TODO: improve formats, make it easy to choose different formats when instantiating the logger
 
 
@@ -34,53 +46,64 @@ class Logger:
         logger = self.configure_logger()
         self.logger = logger
 
-    def debug(self, message):
-        self.logger.debug(message)
+    # the level check skips the logging machinery for disabled levels. extra args are passed
+    # through so hot paths can use lazy formatting, eg logger.debug("read %s rows", n).
+    # stacklevel=2 makes the records name the wrapper's caller rather than these methods
+    def debug(self, message, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(message, *args, stacklevel=2, **kwargs)
 
-    def info(self, message):
-        self.logger.info(message)
+    def info(self, message, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(message, *args, stacklevel=2, **kwargs)
 
-    def warning(self, message):
-        self.logger.warning(message)
+    def warning(self, message, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.WARNING):
+            self.logger.warning(message, *args, stacklevel=2, **kwargs)
 
-    def error(self, message):
-        self.logger.error(message)
+    def error(self, message, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self.logger.error(message, *args, stacklevel=2, **kwargs)
 
-    def critical(self, message):
-        self.logger.critical(message)
+    def critical(self, message, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.CRITICAL):
+            self.logger.critical(message, *args, stacklevel=2, **kwargs)
 
     def configure_logger(self):
 
-        # define output string formats
-        file_formatter = logging.Formatter(LOGFILE_FORMAT)
-        console_formatter = logging.Formatter(CONSOLE_FORMAT)
-        print_formatter = logging.Formatter(PRINT_FORMAT)
-
         logger = logging.getLogger(self.logger_name)
         logger.setLevel(logging.DEBUG)
-        logger.handlers = []
+
+        # drop handlers from an earlier configuration of the same logger so messages aren't duplicated
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
 
         # if console logging is enabled
         if self.console_logger is True:
             console_handler = logging.StreamHandler()
-            set_log_level(console_handler, self.console_log_level)
-            console_handler.setFormatter(console_formatter)
+            console_handler.setLevel(LOG_LEVELS.get(self.console_log_level, logging.WARNING))
+            console_handler.setFormatter(CONSOLE_FORMATTER)
             logger.addHandler(console_handler)
 
         # if file logging is enabled
         if self.file_logger is True:
             file_handler = logging.FileHandler(self.log_file_path)
-            file_handler.setFormatter(file_formatter)
-            set_log_level(file_handler, self.file_log_level)
+            file_handler.setFormatter(LOGFILE_FORMATTER)
+            file_handler.setLevel(LOG_LEVELS.get(self.file_log_level, logging.WARNING))
             logger.addHandler(file_handler)
 
         # if print logging is enabled
         if self.print_logger is True:
             print_handler = logging.StreamHandler()
-            set_log_level(print_handler, self.print_log_level)
-            print_handler.setFormatter(print_formatter)
+            print_handler.setLevel(LOG_LEVELS.get(self.print_log_level, logging.WARNING))
+            print_handler.setFormatter(PRINT_FORMATTER)
             logger.addHandler(print_handler)
 
+        # lower the logger only as far as its most verbose handler so disabled levels are skipped early
+        if logger.handlers:
+            logger.setLevel(min(handler.level for handler in logger.handlers))
+
         return logger
 
 
@@ -88,15 +111,4 @@ def set_log_level(handler, log_level):
     """
     Sets the log level for the given handler.
     """
-    if log_level == "DEBUG":
-        handler.setLevel(logging.DEBUG)
-    elif log_level == "INFO":
-        handler.setLevel(logging.INFO)
-    elif log_level == "WARNING":
-        handler.setLevel(logging.WARNING)
-    elif log_level == "ERROR":
-        handler.setLevel(logging.ERROR)
-    elif log_level == "CRITICAL":
-        handler.setLevel(logging.CRITICAL)
-    else:
-        handler.setLevel(logging.WARNING)
+    handler.setLevel(LOG_LEVELS.get(log_level, logging.WARNING))
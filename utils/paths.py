@@ -1,15 +1,58 @@
 import os
+import stat
 import sys
 import pathlib
 from shutil import rmtree, copy, move
 import fnmatch
-import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from utils.loggers import Logger
 
+# use the linear time re2 engine for the path patterns when it is installed (pip install google-re2)
+try:
+    import re2 as re
+except ImportError:
+    import re
+
 logger = Logger(__name__,
                 console_logger=True,
                 console_log_level="INFO")
 
+# PDX-style mission designator patterns, eg '230204A_SN6390_N740JA'
+MISSION_FIELDS_RE = re.compile(r"(?P<date>\d{6})(?P<index>\w?)_(?P<sensor>SN\d+)(?:_(?P<aircraft>[A-Za-z0-9]+))?")
+# fallbacks for paths without a full mission designator
+MISSION_DATE_RE = re.compile(r"(\d{6})")
+MISSION_INDEX_RE = re.compile(r"\d{6}(\D)")  # captured rather than a lookbehind, which re2 doesn't support
+SENSOR_NUMBER_RE = re.compile(r"SN\d+")
+
+# threads used for file copies and moves, and how many files may be queued for them at once
+FILE_ACTION_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+FILE_ACTION_QUEUE = 64 * FILE_ACTION_WORKERS
+
+
+def absolute_path(in_path, cwd=None):
+    """Absolute version of a path, only looking up the working directory when needed.
+
+    Paths that are already absolute are returned as they are, eg the entry paths
+    found while walking an absolute directory tree, so no getcwd call is made for them.
+
+    Parameters
+    ----------
+    in_path : str
+        A regular string path.
+    cwd : str, optional
+        The working directory to resolve relative paths against. Looked up if not given.
+
+    Returns
+    -------
+    abs_path : str
+        An absolute path.
+
+    """
+    if os.path.isabs(in_path):
+        return in_path
+    return os.path.normpath(os.path.join(cwd or os.getcwd(), in_path))
+
 
 def check_if_file(in_path, must_exist=False, max_extension_length=4):
     """Check if a path represents a file or a directory.
@@ -22,8 +65,9 @@ def check_if_file(in_path, must_exist=False, max_extension_length=4):
 
     Parameters
     ----------
-    in_path : str
-        A regular string path.
+    in_path : str or os.DirEntry
+        A regular string path, or a directory entry from os.scandir (eg from yield_file_entries),
+        in which case its cached file type is used.
     must_exist : bool
         If False, the check will not assume that the input path currently
         exists on the file system and if True, the check will assume that
@@ -40,23 +84,23 @@ def check_if_file(in_path, must_exist=False, max_extension_length=4):
         True if the path is a file, false if it is not.
 
     """
-    in_path = os.path.abspath(in_path)
+    if isinstance(in_path, os.DirEntry):
+        return in_path.is_file()
+    # pathlib paths are parsed as strings below, fspath makes no system call
+    in_path = os.fspath(in_path)
 
-    if os.path.exists(in_path):
-        if os.path.isfile(in_path):
-            return True
-        elif os.path.isdir(in_path):
-            return False
-    elif not must_exist:
+    if must_exist:
+        return os.path.isfile(in_path)
+
+    # a single stat answers both whether the path exists and whether it is a file
+    try:
+        return stat.S_ISREG(os.stat(in_path).st_mode)
+    except (OSError, ValueError):
         # if the file doesn't currently exist
-        # we can parse the string and see if there is a file extension
-        if len(in_path.split(".")) == 1:
-            return False
-        if len(in_path.split(".")) > 1:
-            if len(in_path.split(".")[-1]) <= max_extension_length:
-                return True
-    else:
-        return False
+        # we can parse the string and see if the last path component has a file extension
+        dot = in_path.rfind(".")
+        sep = max(in_path.rfind("/"), in_path.rfind("\\"))
+        return dot > sep and (len(in_path) - dot - 1) <= max_extension_length
 
 
 def drop_filename(in_path, max_extension_length=4):
@@ -82,8 +126,7 @@ def drop_filename(in_path, max_extension_length=4):
         A path without a filename.
 
     """
-    in_path = os.path.abspath(in_path)
-
+    in_path = os.fspath(in_path)
     is_file = check_if_file(in_path, must_exist=False, max_extension_length=max_extension_length)
 
     if is_file:
@@ -123,6 +166,50 @@ def get_drive_letter(in_path):
     return drive_letter
 
 
+def parse_mission_fields(in_path, ignore_filename=True):
+    """
+    All fields of the PDX-style mission designation string.
+
+    Searches the path using regex for the first pdx-style designation
+    string, eg '230204A_SN6390_N740JA', and returns its parts. The aircraft
+    is taken from the first designation string that has one.
+    Use this instead of the individual getters when more than one field is needed.
+
+    Parameters
+    ----------
+    in_path : str
+        A regular string path.
+    ignore_filename : bool
+        If true, the regex search will only look at the directory tree name.
+
+    Returns
+    -------
+    mission_fields : dict
+        The 'mission' string (eg '230204A_SN6390'), mission 'date', mission 'index',
+        'sensor' serial and 'aircraft' tail number. Fields that aren't found are None.
+
+    """
+    in_path = os.fspath(in_path)
+    if ignore_filename:
+        in_path = drop_filename(in_path)
+
+    matches = MISSION_FIELDS_RE.finditer(in_path)
+    mission_fields = next(matches, None)
+    if mission_fields is None:
+        return dict.fromkeys(("mission", "date", "index", "sensor", "aircraft"))
+
+    # the aircraft is often only on a later designation, eg '230204A_SN6390/lidar/230204A_SN6390_N740JA'
+    aircraft_fields = mission_fields
+    while aircraft_fields is not None and aircraft_fields.group("aircraft") is None:
+        aircraft_fields = next(matches, None)
+
+    return {"mission": in_path[mission_fields.start():mission_fields.end("sensor")],
+            "date": mission_fields.group("date"),
+            "index": mission_fields.group("index") or None,
+            "sensor": mission_fields.group("sensor"),
+            "aircraft": aircraft_fields.group("aircraft") if aircraft_fields is not None else None}
+
+
 def get_mission_str(in_path, ignore_filename=True):
     """
     The PDX-style mission designation string.
@@ -144,16 +231,11 @@ def get_mission_str(in_path, ignore_filename=True):
         String of the mission designator.
 
     """
-    in_path = os.path.abspath(in_path)
-
     if ignore_filename:
         in_path = drop_filename(in_path)
-    try:
-        mission_str_pattern = r"(\d{6})\w?_SN\d+"
-        mission_str = re.search(mission_str_pattern, str(in_path))
-        mission_str = mission_str.group(0)
-    except AttributeError:
-        mission_str = None
+
+    mission_str = parse_mission_fields(in_path, ignore_filename=False)["mission"]
+    if mission_str is None:
         logger.info(f"No mission ID found when parsing path {in_path}")
 
     return mission_str
@@ -164,8 +246,9 @@ def get_mission_date(in_path, ignore_filename=True):
     The PDX-style mission date string
 
     Searches the path using regex and returns the pdx-style
-    mission date string, eg '230204'. If the path has more
-    than one mission date, only the first is returned.
+    mission date string, eg '230204'. The date of the first full mission
+    designation string is used, if there isn't one the first 6 digit
+    date in the path is returned.
 
     Parameters
     ----------
@@ -180,13 +263,16 @@ def get_mission_date(in_path, ignore_filename=True):
         String of the mission date.
 
     """
-    in_path = os.path.abspath(in_path)
-
+    in_path = os.fspath(in_path)
     if ignore_filename:
         in_path = drop_filename(in_path)
+
+    mission_fields = parse_mission_fields(in_path, ignore_filename=False)
+    if mission_fields["mission"] is not None:
+        return mission_fields["date"]
+
     try:
-        mission_date_pattern = r"(\d{6})"
-        mission_date = re.search(mission_date_pattern, str(in_path))
+        mission_date = MISSION_DATE_RE.search(in_path)
         mission_date = mission_date.group(0)
     except AttributeError:
         mission_date = None
@@ -200,8 +286,9 @@ def get_mission_index(in_path, ignore_filename=True):
     The PDX-style mission index string
 
     Searches the path using regex and returns the pdx-style
-    mission index string, eg 'A' or 'B'. If the path has more
-    than one mission index, only the first is returned.
+    mission index string, eg 'A' or 'B'. The index of the first full mission
+    designation string is used, if there isn't one the first non-digit
+    following a 6 digit date in the path is returned.
 
     Parameters
     ----------
@@ -216,14 +303,19 @@ def get_mission_index(in_path, ignore_filename=True):
         String of the mission date.
 
     """
-    in_path = os.path.abspath(in_path)
-
+    in_path = os.fspath(in_path)
     if ignore_filename:
         in_path = drop_filename(in_path)
+
+    mission_fields = parse_mission_fields(in_path, ignore_filename=False)
+    if mission_fields["mission"] is not None:
+        if mission_fields["index"] is None:
+            logger.info(f"No mission index found when parsing path {in_path}")
+        return mission_fields["index"]
+
     try:
-        mission_index_pattern = r"(?<=\d{6})\D"
-        mission_index = re.search(mission_index_pattern, str(in_path))
-        mission_index = (mission_index.group(0))
+        mission_index = MISSION_INDEX_RE.search(in_path)
+        mission_index = (mission_index.group(1))
     except AttributeError:
         mission_index = None
         logger.info(f"No mission index found when parsing path {in_path}")
@@ -237,8 +329,8 @@ def get_sensor_number(in_path, ignore_filename=True):
 
     Searches the path using regex and returns the PDX-style
     sensor serial identifier string, eg 'SN4040' or 'SN9967'.
-    If the path has more than one sensor serial identifier,
-    only the first is returned.
+    The sensor of the first full mission designation string is used,
+    if there isn't one the first sensor serial identifier in the path is returned.
 
     Parameters
     ----------
@@ -253,13 +345,16 @@ def get_sensor_number(in_path, ignore_filename=True):
         String of the sensor serial number, including the 'SN'.
 
     """
-    in_path = os.path.abspath(in_path)
-
+    in_path = os.fspath(in_path)
     if ignore_filename:
         in_path = drop_filename(in_path)
+
+    mission_fields = parse_mission_fields(in_path, ignore_filename=False)
+    if mission_fields["mission"] is not None:
+        return mission_fields["sensor"]
+
     try:
-        sensor_number_pattern = r"SN\d+"
-        sensor_number = re.search(sensor_number_pattern, str(in_path))
+        sensor_number = SENSOR_NUMBER_RE.search(in_path)
         sensor_serial = (sensor_number.group(0))
     except AttributeError:
         sensor_serial = None
@@ -275,8 +370,8 @@ def get_aircraft(in_path, ignore_filename=True):
     Searches the path using regex and returns the PDX-style
     aircraft tail number string, eg 'N740JA' or 'N9984K'.
     Because of the variability in aircraft naming, this search
-    looks for the full string 'mission_sensor_aircraft', then splits
-    the string and takes the last element.
+    looks for the full string 'mission_sensor_aircraft' and takes
+    the element following the sensor.
 
     Parameters
     ----------
@@ -291,18 +386,12 @@ def get_aircraft(in_path, ignore_filename=True):
         String of the aircraft tail number.
 
     """
-    in_path = os.path.abspath(in_path)
-
     if ignore_filename:
         in_path = drop_filename(in_path)
-    try:
-        aircraft_identifier_pattern = r"(\d{6})\w?_SN\d+_[A-Za-z0-9]+"
-        aircraft_identifier = re.search(aircraft_identifier_pattern, str(in_path))
-        aircraft_identifier = (aircraft_identifier.group(0))
-        aircraft_identifier = aircraft_identifier.split("_")[-1]
-    except AttributeError:
-        aircraft_identifier = None
-        logger.info(f"No sensor number found when parsing path {in_path}")
+
+    aircraft_identifier = parse_mission_fields(in_path, ignore_filename=False)["aircraft"]
+    if aircraft_identifier is None:
+        logger.info(f"No aircraft found when parsing path {in_path}")
 
     return aircraft_identifier
 
@@ -322,8 +411,6 @@ def parse_filepath(in_path):
         Filename without extension, Filename with extension, Only the filetype extension
 
     """
-    in_path = os.path.abspath(in_path)
-
     try:
         parent_dir = os.path.dirname(in_path)
         parent_dir_with_filename, ext = os.path.splitext(in_path)
@@ -389,7 +476,7 @@ def delete_path(in_path):
     #     logger.error(f"Cannot delete directory for path {in_path}.")
     #     logger.error(e)
 
-    in_path = os.path.abspath(in_path)
+    in_path = absolute_path(in_path)
     try:
         if os.path.isdir(in_path):
             rmtree(str(in_path))
@@ -428,33 +515,76 @@ def yield_file_paths(in_path, extensions=None, exclude_strings=None, exclude_fol
         File paths found in the directory tree.
 
     """
-    in_path = os.path.abspath(in_path)
+    for entry in yield_file_entries(in_path,
+                                    extensions=extensions,
+                                    exclude_strings=exclude_strings,
+                                    exclude_folders=exclude_folders,
+                                    recursive=recursive):
+        yield entry.path
+
+
+def yield_file_entries(in_path, extensions=None, exclude_strings=None, exclude_folders=None, recursive=True):
+    """Yield directory entries for the files in a directory or directory tree.
+
+    Same as yield_file_paths, but yields the os.DirEntry objects found by os.scandir.
+    Their stat() results are cached (and on Windows come from the directory listing itself),
+    so file sizes and types can be read without another system call per file.
+
+    Parameters
+    ----------
+    in_path : str
+        A regular string path.
+    extensions : list[str], optional
+        A list of file extensions to use for filtering. Eg, ['rxp', 'las']
+        The extensions given will be kept and other file types ignored.
+    exclude_strings : list[str], optional
+        A list of strings that, if found in the file name, will cause that file to be ignored. Eg, ['test', 'iter_1']
+    exclude_folders : list[str], optional
+        A list of folder names that will be ignored. Eg, ['do_not_use', 'ignore', 'bad_lines']
+    recursive : bool, optional
+        If True, the search will recursively search subdirectories.
 
-    # convert all extensions and filters to lowercase
+    Yields
+    -------
+    entry : os.DirEntry
+        Directory entries of the files found in the directory tree.
+
+    """
+    in_path = absolute_path(in_path)
+
+    # convert all extensions and filters to lowercase once for the whole walk
     if extensions is not None:
-        extensions = [ext.lower() for ext in extensions]
+        extensions = tuple(ext.lower() for ext in extensions)
     if exclude_strings is not None:
-        exclude_strings = [ex_str.lower() for ex_str in exclude_strings]
+        exclude_strings = tuple(ex_str.lower() for ex_str in exclude_strings)
     if exclude_folders is not None:
-        exclude_folders = [ex_fldr.lower() for ex_fldr in exclude_folders]
-
-    with os.scandir(in_path) as path_iter:
-        for entry in path_iter:
-            if entry.is_file() \
-                    and (extensions is None
-                         or entry.name.lower().endswith(tuple(extensions))) \
-                    and (exclude_strings is None
-                         or not any(ex_str in entry.name.lower() for ex_str in exclude_strings)):
-                yield entry.path
-            elif entry.is_dir() \
-                    and recursive \
-                    and (exclude_folders is None
-                         or entry.name.lower() not in exclude_folders):
-                yield from yield_file_paths(entry.path,
-                                            extensions=extensions,
-                                            exclude_strings=exclude_strings,
-                                            recursive=recursive,
-                                            exclude_folders=exclude_folders)
+        exclude_folders = frozenset(ex_fldr.lower() for ex_fldr in exclude_folders)
+
+    yield from _yield_file_entries(in_path, extensions, exclude_strings, exclude_folders, recursive)
+
+
+def _yield_file_entries(in_path, extensions, exclude_strings, exclude_folders, recursive):
+    """Directory walk for yield_file_entries, expects the filters already lowercased
+    (extensions and exclude_strings as tuples, exclude_folders as a set).
+
+    Directories are queued and listed one at a time instead of recursing, so each
+    listing is closed before the next one is opened."""
+    dirs = deque([in_path])
+    while dirs:
+        with os.scandir(dirs.popleft()) as path_iter:
+            for entry in path_iter:
+                name_lower = entry.name.lower()
+                if entry.is_file() \
+                        and (extensions is None
+                             or name_lower.endswith(extensions)) \
+                        and (exclude_strings is None
+                             or not any(ex_str in name_lower for ex_str in exclude_strings)):
+                    yield entry
+                elif entry.is_dir() \
+                        and recursive \
+                        and (exclude_folders is None
+                             or name_lower not in exclude_folders):
+                    dirs.append(entry.path)
 
 
 def get_filecount_and_size(in_path,
@@ -518,40 +648,87 @@ def get_filecount_and_size(in_path,
         else:
             logger.info(f"{action.lower()} files to {out_path}.")
 
-    for file_path in yield_file_paths(in_path,
-                                      extensions=extensions,
-                                      exclude_strings=exclude_strings,
-                                      exclude_folders=exclude_folders,
-                                      recursive=recursive):
-        # if the user wants a file list, append the file name
+    if action is None:
+        # without per file actions the walk reduces to a count and a sum over the cached entry stats
+        entries = list(yield_file_entries(in_path,
+                                          extensions=extensions,
+                                          exclude_strings=exclude_strings,
+                                          exclude_folders=exclude_folders,
+                                          recursive=recursive))
+        file_count = len(entries)
+        total_size = sum(entry.stat().st_size for entry in entries)
         if file_list:
-            file_paths.append(file_path)
-
-        # work around to deal with long path names (>255 characters)
-        long_file_path = "\\\\?\\" + file_path
-
-        # count the files and get a total size
-        file_count += 1
-        total_size += os.path.getsize(long_file_path)
-
-        # check if the user wanted any actions done
-        if action is None:
-            pass
-        elif action.lower() == "delete":
-            try:
-                delete_path(long_file_path)
-            except Exception as e:
-                logger.info(f"Unexpected error {e} when deleting file {file_path}")
-        elif action.lower() == "copy":
-            try:
-                copy(long_file_path, out_path)
-            except Exception as e:
-                logger.info(f"Unexpected error {e} when copying file {file_path}")
-        elif action.lower() == "move":
-            try:
-                move(long_file_path, out_path)
-            except Exception as e:
-                logger.info(f"Unexpected error {e} when moving file {file_path}")
+            file_paths = [entry.path for entry in entries]
+
+        # report size in GB
+        total_size = round(total_size / 1_073_741_824.0, 6)
+
+        return file_count, total_size, file_paths
+
+    # copies and moves are i/o bound, so they are handed to a thread pool while the walk continues
+    if action.lower() in ["copy", "move"]:
+        executor = ThreadPoolExecutor(max_workers=FILE_ACTION_WORKERS)
+    else:
+        executor = None
+    # queued actions and their destinations
+    pending = {}
+    # the last action queued for each destination, files with the same name from different folders
+    # (or every file, when out_path isn't a directory) must reach it in walk order, as they did when run one at a time
+    claimed = {}
+    out_path_is_dir = out_path is not None and os.path.isdir(out_path)
+
+    try:
+        for entry in yield_file_entries(in_path,
+                                        extensions=extensions,
+                                        exclude_strings=exclude_strings,
+                                        exclude_folders=exclude_folders,
+                                        recursive=recursive):
+            file_path = entry.path
+
+            # if the user wants a file list, append the file name
+            if file_list:
+                file_paths.append(file_path)
+
+            # work around to deal with long path names (>255 characters), only needed on windows
+            if os.name == "nt" and len(file_path) > 255:
+                long_file_path = "\\\\?\\" + file_path
+            else:
+                long_file_path = file_path
+
+            # count the files and get a total size, the entry caches its stat so no extra system call is needed
+            file_count += 1
+            total_size += entry.stat().st_size
+
+            # do the action the user asked for
+            if action.lower() == "delete":
+                try:
+                    delete_path(long_file_path)
+                except Exception as e:
+                    logger.info(f"Unexpected error {e} when deleting file {file_path}")
+            elif action.lower() in ["copy", "move"]:
+                if out_path_is_dir:
+                    destination = os.path.normcase(os.path.join(out_path, entry.name))
+                else:
+                    destination = out_path
+                if destination in claimed:
+                    claimed[destination].result()
+                if action.lower() == "copy":
+                    future = executor.submit(_file_action, copy, long_file_path, out_path, file_path, "copying")
+                else:
+                    future = executor.submit(_file_action, move, long_file_path, out_path, file_path, "moving")
+                claimed[destination] = future
+                pending[future] = destination
+
+            # keep the number of queued files bounded on very large trees, finished actions release their claim
+            if len(pending) >= FILE_ACTION_QUEUE:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    destination = pending.pop(future)
+                    if claimed.get(destination) is future:
+                        del claimed[destination]
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
 
     # report size in GB
     total_size = round(total_size / 1_073_741_824.0, 6)
@@ -559,6 +736,14 @@ def get_filecount_and_size(in_path,
     return file_count, total_size, file_paths
 
 
+def _file_action(action_function, long_file_path, out_path, file_path, description):
+    """Runs a copy or move for get_filecount_and_size, logging any failure like the other actions."""
+    try:
+        action_function(long_file_path, out_path)
+    except Exception as e:
+        logger.info(f"Unexpected error {e} when {description} file {file_path}")
+
+
 def pattern_matcher(in_file, patterns):
     """Checks for patterns in a file name.
 
@@ -577,14 +762,37 @@ def pattern_matcher(in_file, patterns):
         True if the file name has the pattern.
 
     """
-    # convert patterns to lowercase
-    patterns = [pattern.lower() for pattern in patterns]
+    # compare in lowercase, every pattern is checked until one matches
+    in_file = in_file.lower()
+    return any(fnmatch.fnmatchcase(in_file, pattern.lower()) for pattern in patterns)
 
-    for p in patterns:
-        if fnmatch.fnmatch(in_file, p):
-            return True
-        else:
-            return False
+
+def filter_files(in_files, patterns):
+    """Filters a list of file names by patterns.
+
+    Each pattern is compiled once and applied to the whole list, which is
+    faster than calling pattern_matcher for every file.
+
+    Parameters
+    ----------
+    in_files : list[str]
+        A list of regular string paths.
+    patterns : list[str]
+        A list of patterns to use for filtering.
+
+    Returns
+    -------
+    matches : list[str]
+        The file names matching any of the patterns, in their original order.
+
+    """
+    # compare in lowercase, like pattern_matcher
+    lower_files = [in_file.lower() for in_file in in_files]
+    matched = set()
+    for pattern in patterns:
+        matched.update(fnmatch.filter(lower_files, pattern.lower()))
+
+    return [in_file for in_file, lower_file in zip(in_files, lower_files) if lower_file in matched]
 
 
 def extension_matcher(in_file, extensions):
@@ -1,14 +1,26 @@
+import math
+from functools import lru_cache
 from os.path import basename
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.colors
+import matplotlib.cm
 import cartopy.io.img_tiles as cimgt
 import cartopy.crs as ccrs
 from cartopy.mpl.ticker import LongitudeFormatter, LatitudeFormatter
 
 
-def plot_windspeed_errors(aimms_df, output_file):
+@lru_cache(maxsize=None)
+def _stamen_terrain():
+    """ Basemap tile source shared by every plot, built on first use rather than at import.
+
+    Tiles are cached on disk so repeat runs over an area skip the downloads.
+    """
+    return cimgt.Stamen(style="terrain", cache=True)
+
+
+def plot_windspeed_errors(aimms_df, output_file, dpi=300):
     """ Plot the windspeed and potential wind speed errors. Overlays the plot on a basemap for spatial context.
 
     Required Parameters
@@ -18,16 +30,21 @@ def plot_windspeed_errors(aimms_df, output_file):
     output_file : str
         The output plot file.
 
+    Optional Parameters
+    ----------
+    dpi : int
+        Resolution of the saved plot. Defaults to 300.
+
     """
-    # plot positions
-    sbet_df = aimms_df.iloc[::5, :]  # thin data a bit
-    #sbet_df = aimms_df
-    #sbet_df.loc[:, "Lat"] = sbet_df.Long.map(np.degrees)
-    #sbet_df.loc[:, "Long"] = sbet_df.Lat.map(np.degrees)
-    x_min = round(sbet_df["Long"].min(), 3)
-    x_max = round(sbet_df["Long"].max(), 3)
-    y_min = round(sbet_df["Lat"].min(), 3)
-    y_max = round(sbet_df["Lat"].max(), 3)
+    # plot positions, only the three plotted columns are pulled out and thinned a bit.
+    # single precision (~1 m for coordinates) is plenty for the plot and halves the data matplotlib works through
+    lon = aimms_df["Long"].to_numpy()[::5].astype(np.float32)
+    lat = aimms_df["Lat"].to_numpy()[::5].astype(np.float32)
+    ws = aimms_df["Computed_WS"].to_numpy()[::5].astype(np.float32)
+    x_min = round(float(np.nanmin(lon)), 3)
+    x_max = round(float(np.nanmax(lon)), 3)
+    y_min = round(float(np.nanmin(lat)), 3)
+    y_max = round(float(np.nanmax(lat)), 3)
     x_range = x_max - x_min
     y_range = y_max - y_min
     x_border = x_range * 0.2
@@ -38,19 +55,22 @@ def plot_windspeed_errors(aimms_df, output_file):
     y_max = round(y_max + y_border / 2, 3)
     print(f"Trajectory plot boundaries: {x_min}, {x_max}, {y_min}, {y_max}")
 
-    fig = plt.figure()
-    ax = plt.axes(projection=ccrs.PlateCarree())
+    fig = plt.figure(figsize=(15, 10))
+    ax = fig.add_subplot(projection=ccrs.PlateCarree())
 
     # plot basemap
     # imagery = OSM()
-    stamen_terrain = cimgt.Stamen(style="terrain")
 
-    # estimate an appropriate scale
-    scale = np.ceil(-np.sqrt(2) * np.log(np.divide((x_max - x_min) / 2.0, 350.0))) + 1
-    scale = (scale < 20) and scale or 19  # scale cannot be larger than 19
+    # estimate an appropriate scale, a single point gets the closest zoom
+    half_extent = (x_max - x_min) / 2.0
+    if half_extent > 0:
+        scale = math.ceil(-math.sqrt(2) * math.log(half_extent / 350.0)) + 1
+    else:
+        scale = 19
+    scale = int(min(max(scale, 1), 19))  # scale must be between 1 and 19
     # logger.info(f"Set map scale to {scale}.")
 
-    ax.add_image(stamen_terrain, int(scale))
+    ax.add_image(_stamen_terrain(), scale)
     # ax.add_image(imagery, int(scale))
 
     # format the plot area
@@ -73,11 +93,19 @@ def plot_windspeed_errors(aimms_df, output_file):
     boundaries = [0, 1, 27, 999]
     norm = matplotlib.colors.BoundaryNorm(boundaries, cmap.N, clip=True)
 
+    # classify the wind speeds into the color bins in one pass, the same bins as the norm with clipping.
+    # points without a wind speed (the start of the smoothing window) are left off, as the norm would mask them
+    has_ws = ~np.isnan(ws)
+    colors = cmap(np.digitize(ws[has_ws], boundaries[1:-1]))
+
     # plot the trajectory coordinates
-    sbet_df.plot.scatter(x="Long", y="Lat", c='Computed_WS',  s=0.5, colormap=cmap, norm=norm, ax=ax, figsize=(15, 10))
+    ax.scatter(lon[has_ws], lat[has_ws], c=colors, s=0.5, rasterized=True)
+    fig.colorbar(matplotlib.cm.ScalarMappable(norm=norm, cmap=cmap), ax=ax, label="Computed_WS")
     # plt.show()
     # save and close
-    plt.title(f"Windspeed Errors for {basename(output_file)}", fontsize=10)
-    plt.savefig(output_file,
-                bbox_inches="tight", format="png", dpi=900)
+    ax.set_title(f"Windspeed Errors for {basename(output_file)}", fontsize=10)
+    # light png compression, the default zlib level is slow on large plots for little size gain
+    fig.savefig(output_file,
+                bbox_inches="tight", format="png", dpi=dpi,
+                pil_kwargs={"optimize": False, "compress_level": 1})
     plt.close(fig)
\ No newline at end of file
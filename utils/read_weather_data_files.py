@@ -1,6 +1,27 @@
+import numpy as np
 import pandas as pd
 import sys
-import re
+
+# the multithreaded arrow csv parser is used for the solar files when it is installed (pip install pyarrow)
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# aimms columns kept for QC, these lead every format and are all plain floats
+AIMMS_COLUMNS = ['Time', 'Temp', 'RH', 'P_stat', 'Uw', 'Vw', 'Lat', 'Long', 'Z', 'Ui', 'Vi', 'Wi',
+                 'Roll', 'Pitch', 'Heading', 'TAS', 'Ww']
+AIMMS_DTYPES = dict.fromkeys(AIMMS_COLUMNS, "float64")
+
+# full column layout of each aimms extract format, only the leading AIMMS_COLUMNS are parsed
+AIMMS_FORMATS = {
+    "geo1_old": AIMMS_COLUMNS + ['AoS', 'P_beta', 'P_alpha', 'C_p', 'W_spd', 'W_dir'],
+    "geo1_new": AIMMS_COLUMNS + ['AoS', 'P_beta', 'P_alpha', 'W_spd', 'W_dir', 'Turb', "LoadF"],
+    "nv5": AIMMS_COLUMNS + ['DimAoS', "AoA", "AoS", "Wind_Status"],
+}
+
+# aimms times are decimal hours of the utc day, they are placed on the same date strptime gives a bare time
+AIMMS_DATE = pd.Timestamp("1900-01-01")
 
 
 def solar_to_df(solar_file,
@@ -46,25 +67,50 @@ def solar_to_df(solar_file,
         Pandas dataframe of the solar probe timeseries data
 
     """
-    # read the first line to determine the units
-    with open(solar_file, "r") as f:
-        first_line = f.readline()
-        units = first_line.split(",")[2].strip()
-        print(f"\n\nDiscovered {units} units for solar irradiance.")
-
     # set the columns of the dataframe
     columns = columns or ["Date", "LocalTime", "MicroMoles"]
 
-    # read the data into a dataframe
-    raw_solar_df = pd.read_csv(solar_file, skiprows=header_rows, delimiter=delimiter, names=columns)
+    # the probe gives ~4 significant digits, single precision holds them at half the memory
+    dtypes = {"MicroMoles": np.float32} if "MicroMoles" in columns else {}
 
-    # format the time column, this is generally local time (computer time)
-    raw_solar_df[time_column] = raw_solar_df[time_column].str.lstrip()
-    raw_solar_df[time_column] = pd.to_datetime(raw_solar_df[time_column], format=time_format)
+    with open(solar_file, "r") as f:
+        # read the first line to determine the units
+        first_line = f.readline()
+        units = first_line.split(",", 3)[2].strip()
+        print(f"\n\nDiscovered {units} units for solar irradiance.")
+
+        # the parser reads the data from the same handle, starting over so the units line counts as a header row
+        f.seek(0)
+
+        # read the data into a dataframe, the time column is generally local time (computer time)
+        raw_solar_df = None
+        if pyarrow is not None:
+            # the arrow parser can't strip the padding, so the time column is read as text and converted after.
+            # anything it can't handle (eg a file that isn't utf-8) falls back to the c parser
+            try:
+                raw_solar_df = pd.read_csv(f.buffer, engine="pyarrow", skiprows=header_rows, delimiter=delimiter,
+                                           names=columns, dtype={**dtypes, time_column: str})
+                raw_solar_df[time_column] = pd.to_datetime(raw_solar_df[time_column].str.lstrip(),
+                                                           format=time_format, cache=True)
+            except (ImportError, ValueError):
+                raw_solar_df = None
+                f.seek(0)
+
+        if raw_solar_df is None:
+            # the c parser strips the padding and converts the time column, repeated time strings are only parsed once
+            raw_solar_df = pd.read_csv(f, skiprows=header_rows, delimiter=delimiter, names=columns, dtype=dtypes,
+                                       skipinitialspace=True, parse_dates=[time_column], date_format=time_format,
+                                       cache_dates=True)
 
     # convert the units if needed.
     if units == "watts/m2" or units == "W/m2" or units == "Watts":
-        raw_solar_df["MicroMoles"] = raw_solar_df["MicroMoles"] * 4.57
+        # scale the float column in place rather than allocating a new series, integer readings (or a
+        # read-only copy-on-write view) still need the new column
+        micromoles = raw_solar_df["MicroMoles"].to_numpy()
+        if micromoles.dtype.kind == "f" and micromoles.flags.writeable:
+            np.multiply(micromoles, 4.57, out=micromoles)
+        else:
+            raw_solar_df["MicroMoles"] = micromoles * 4.57
         print("Converting W/m2 to MicroMoles")
     elif units == "Î¼moles":
         print("No unit conversion applied.")
@@ -113,45 +159,31 @@ def aimms_to_df(aimms_file, format=None):
 
     # read the 2nd line to determine the format
     if format is None:
-        with open(aimms_file) as f:
-            line = f.readlines()[1]  # the second line should be indicative of the format
-            line = re.sub("\s+", ",", line.strip())  # the whitespace may not be consistent so replace with commas
-            if "AoS,P_beta,P_alpha,W_spd,W_dir,Turb,LoadF." in line:
-                format = "geo1_new"
-            elif "AoS,P_beta,P_alpha,C_p,W_spd,W_dir" in line:
-                format = "geo1_old"
-            else:  # the nv5 format has no header
-                format = "nv5"
-
-    if format == "geo1_old":
-        aimms_df = pd.read_csv(aimms_file, skiprows=3, delimiter=r'\s+', skipinitialspace=True,
-                               names=['Time', 'Temp', 'RH', 'P_stat', 'Uw', 'Vw', 'Lat', 'Long', 'Z', 'Ui', 'Vi', 'Wi',
-                                      'Roll', 'Pitch', 'Heading', 'TAS', 'Ww', 'AoS', 'P_beta', 'P_alpha', 'C_p',
-                                      'W_spd', 'W_dir'])
-        # drop the final columns which are inconsistent between formats and not necessary for QC
-        aimms_df = aimms_df.drop(columns=['AoS', 'P_beta', 'P_alpha', 'C_p', 'W_spd', 'W_dir'])
-
-    elif format == "geo1_new":
-        aimms_df = pd.read_csv(aimms_file, skiprows=3, delimiter=r'\s+', skipinitialspace=True,
-                               names=['Time', 'Temp', 'RH', 'P_stat', 'Uw', 'Vw', 'Lat', 'Long', 'Z', 'Ui', 'Vi', 'Wi',
-                                      'Roll', 'Pitch', 'Heading', 'TAS', 'Ww', 'AoS', 'P_beta', 'P_alpha', 'W_spd',
-                                      'W_dir', 'Turb', "LoadF"])
-        # drop the final columns which are inconsistent between formats and not necessary for QC
-        aimms_df = aimms_df.drop(columns=['AoS', 'P_beta', 'P_alpha', 'W_spd', 'W_dir', 'Turb', "LoadF"])
-
-    elif format == "nv5":
-        aimms_df = pd.read_csv(aimms_file, skiprows=3, delimiter=r'\s+', skipinitialspace=True,
-                               names=['Time', 'Temp', 'RH', 'P_stat', 'Uw', 'Vw', 'Lat', 'Long', 'Z', 'Ui', 'Vi', 'Wi',
-                                      'Roll', 'Pitch', 'Heading', 'TAS', 'Ww', 'DimAoS', "AoA", "AoS", "Wind_Status"])
-        # drop the final columns which are inconsistent between formats and not necessary for QC
-        aimms_df = aimms_df.drop(columns=['DimAoS', "AoA", "AoS", "Wind_Status"])
-
-    else:
+        with open(aimms_file, "rb") as f:
+            f.readline()
+            line = f.readline()  # the second line should be indicative of the format
+        # the whitespace may not be consistent, but the trailing header fields are unique to each format
+        if b"Turb" in line and b"LoadF" in line:
+            format = "geo1_new"
+        elif b"C_p" in line:
+            format = "geo1_old"
+        else:  # the nv5 format has no header
+            format = "nv5"
+
+    # the final columns are inconsistent between formats and not necessary for QC, so only the leading
+    # QC columns are parsed
+    if format not in AIMMS_FORMATS:
         sys.exit(f"Weather format {format} not recognized!")
+    aimms_df = pd.read_csv(aimms_file, skiprows=3, delimiter=r'\s+', engine='c',
+                           usecols=AIMMS_COLUMNS, dtype=AIMMS_DTYPES, names=AIMMS_FORMATS[format])
 
     # TODO: fix utc midnight rollover
-    aimms_df['Time'] = aimms_df['Time'].apply(decimal_hours_to_hh_mm_ss)
-    aimms_df['Time'] = pd.to_datetime(aimms_df['Time'], format='%H:%M:%S.%f')
+    # convert the decimal hours straight to nanoseconds, forcing the clock to roll over at utc midnight.
+    # the times are rounded to the centisecond like the old hh:mm:ss.ss strings, the decimal hours only carry
+    # a few digits so finer intervals are noise that would skew the sample rate and smoothing windows
+    hours = aimms_df['Time'].to_numpy() % 24
+    centiseconds = np.rint(hours * 360_000).astype(np.int64)
+    aimms_df['Time'] = AIMMS_DATE + pd.to_timedelta(centiseconds * 10_000_000, unit='ns')
 
     return aimms_df
 
@@ -159,6 +191,9 @@ def aimms_to_df(aimms_file, format=None):
 def decimal_hours_to_hh_mm_ss(time):
     """ Convert a decimal hour to an hh:mm:ss format.
 
+    Legacy, nothing in this repo calls it any more. aimms_to_df converts the whole Time column to
+    datetimes numerically. It is kept for outside scripts converting single values.
+
     Required Parameters
     ----------
     timestamp : float
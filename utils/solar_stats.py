@@ -1,6 +1,9 @@
 from os.path import dirname, realpath, basename, splitext, join, isdir
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from colorama import init, Fore, Style
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.colors
@@ -10,8 +13,8 @@ from utils.gooey_wrapper import gooey_on_empty_args, GooeyParser
 from utils.loggers import Logger
 from utils.paths import get_filecount_and_size
 
-# set plotting backend to avoid QT errors
-matplotlib.use('TKAgg')
+# set a headless plotting backend to avoid QT errors, it also works inside the worker processes
+matplotlib.use('Agg')
 
 # initialize terminal text coloring
 init()
@@ -19,7 +22,7 @@ init()
 __version__ = "0.0.1"
 
 
-def solar_to_stats(solar_file, out_dir=None, utc_offset=7.0, start_time=None, end_time=None, smoothing=20):
+def solar_to_stats(solar_file, out_dir=None, utc_offset=7.0, start_time=None, end_time=None, smoothing=20, dpi=150):
     """ Compute statistics for collected solar data, warn the user of anomalous data, and plot the data.
 
     Illumination, also known as "irradiance", is sometimes measured in watts per square meter (W/m2).
@@ -53,6 +56,8 @@ def solar_to_stats(solar_file, out_dir=None, utc_offset=7.0, start_time=None, en
     smoothing : float
         Smooths the time series data using a Simple Moving Average. Helps to reduce false positives and information
         overload. Default is a 10 period SMA.
+    dpi : int
+        Resolution of the saved timeseries plot. Defaults to 150.
     """
     # read the raw data
     raw_solar_df, units = solar_to_df(solar_file,
@@ -72,33 +77,44 @@ def solar_to_stats(solar_file, out_dir=None, utc_offset=7.0, start_time=None, en
         timeseries_plot = splitext(solar_file)[0] + "_solar_timeseries_plot.png"
         # spatial_plot = splitext(solar_file)[0] + "_spatial_plot.png"
 
-    # compute some statistics
-    average_photon_flux = round(raw_solar_df["MicroMoles"].mean(), 1)
-    median_photon_flux = round(raw_solar_df["MicroMoles"].median(), 1)
-    max_photon_flux = round(raw_solar_df["MicroMoles"].max(), 1)
-    min_photon_flux = round(raw_solar_df['MicroMoles'].min(), 1)
-    stdev_photon_flux = round(raw_solar_df['MicroMoles'].std(), 1)
-
-    # get local (laptop) and utc time stamps
-    local_start_time = raw_solar_df['LocalTime'].iloc[0].time()
-    local_end_time = raw_solar_df['LocalTime'].iloc[-1].time()
-    utc_start_time = (raw_solar_df['LocalTime'].iloc[0] - pd.Timedelta(hours=utc_offset)).time()
-    utc_end_time = (raw_solar_df['LocalTime'].iloc[-1] - pd.Timedelta(hours=utc_offset)).time()
-
-    # estimate sample rate:
-    sample_rate = raw_solar_df['LocalTime'].diff().median()
+    # compute some statistics, on the array so each one is a single numpy pass (nan skipping like pandas).
+    # the single precision values are accumulated in double precision
+    micromoles = raw_solar_df["MicroMoles"].to_numpy()
+    average_photon_flux = round(float(np.nanmean(micromoles, dtype=np.float64)), 1)
+    median_photon_flux = round(float(np.nanmedian(micromoles)), 1)
+    max_photon_flux = round(float(np.nanmax(micromoles)), 1)
+    min_photon_flux = round(float(np.nanmin(micromoles)), 1)
+    stdev_photon_flux = round(float(np.nanstd(micromoles, ddof=1, dtype=np.float64)), 1)
+
+    # get local (laptop) and utc time stamps, from the time column array rather than indexing the series
+    local_times = raw_solar_df['LocalTime'].to_numpy()
+    local_start = pd.Timestamp(local_times[0])
+    local_end = pd.Timestamp(local_times[-1])
+    local_start_time = local_start.time()
+    local_end_time = local_end.time()
+    utc_start_time = (local_start - pd.Timedelta(hours=utc_offset)).time()
+    utc_end_time = (local_end - pd.Timedelta(hours=utc_offset)).time()
+
+    # estimate sample rate, the median interval so that gaps in the recording don't inflate it:
+    # the timestamps are brought to nanoseconds first so the integer differences are in a known unit
+    time_ns = local_times.astype("datetime64[ns]").view(np.int64)
+    sample_rate = pd.Timedelta(np.median(np.diff(time_ns)), unit="ns")
 
     # get number of records and time duration of the collection
-    length = len(raw_solar_df['LocalTime'].index)
+    length = len(local_times)
     estimated_seconds = round(length * sample_rate.total_seconds(), 1)
-    duration = (raw_solar_df['LocalTime'].iloc[-1]) - (raw_solar_df['LocalTime'].iloc[0])
+    duration = local_end - local_start
     duration_from_length = pd.Timedelta(seconds=estimated_seconds)
 
     # smooth the data
     smoothing_rate = int(smoothing / sample_rate.total_seconds())
     if smoothing_rate < 1:
         smoothing_rate = 1
-    raw_solar_df["MicroMoles"] = raw_solar_df["MicroMoles"].rolling(window=smoothing_rate).mean()
+    # a one record window leaves the data unchanged. the leading records are averaged over the partial window.
+    # the rolling mean accumulates in double precision, the result goes back to the column's single precision
+    if smoothing_rate > 1:
+        smoothed = raw_solar_df["MicroMoles"].rolling(window=smoothing_rate, min_periods=1).mean()
+        raw_solar_df["MicroMoles"] = smoothed.astype(raw_solar_df["MicroMoles"].dtype)
 
     # check for critical errors
 
@@ -115,96 +131,72 @@ def solar_to_stats(solar_file, out_dir=None, utc_offset=7.0, start_time=None, en
     # are there way fewer records than we'd expect for the time duration?
     time_difference = duration - duration_from_length
 
+    # count the flagged records on the smoothed values without building filtered dataframes
+    micromoles = raw_solar_df["MicroMoles"].to_numpy()
+
     # are there zero values and if so how many?
-    zero_value_df = raw_solar_df.loc[raw_solar_df['MicroMoles'] == 0]
-    zero_value_records = len(zero_value_df['LocalTime'].index)
+    zero_value_records = int(np.count_nonzero(micromoles == 0))
 
     # are there lots of low values and if so how many?
-    low_value_df = raw_solar_df.loc[raw_solar_df['MicroMoles'] <= 300]
-    low_value_records = len(low_value_df['LocalTime'].index)
+    low_value_records = int(np.count_nonzero(micromoles <= 300))
 
     # are there lots of high values and if so how many?
-    high_value_df = raw_solar_df.loc[raw_solar_df['MicroMoles'] >= 1500]
-    high_value_records = len(high_value_df['LocalTime'].index)
-
-    print(Fore.YELLOW + "\n\n### Solar Probe Statistics ###\n")
-    print(Style.RESET_ALL + f"Data collected for {duration}.")
-    print(f"Collected {length} records.\n")
-    print(f"Records cover an estimated {duration_from_length} at {sample_rate.total_seconds()} sample rate.")
-    print(f"Solar flux smoothed with a {smoothing} second moving average.\n")
-    print(f"Survey UTC Start Time: {start_time}")
-    print(f"Survey UTC End Time: {end_time}")
-    print(f"Solar UTC Start Time: {utc_start_time}")
-    print(f"Solar UTC End Time: {utc_end_time}")
-    print(f"Solar Local Start Time: {local_start_time}")
-    print(f"Solar Local End Time: {local_end_time}\n")
-    print(f"Average photon flux: {average_photon_flux} micromoles")
-    print(f"Photon flux StDev: {stdev_photon_flux} micromoles")
-    print(f"Median photon flux: {median_photon_flux} micromoles")
-    print(f"Minimum photon flux: {min_photon_flux} micromoles")
-    print(f"Maximum photon flux: {max_photon_flux} micromoles\n")
-
+    high_value_records = int(np.count_nonzero(micromoles >= 1500))
+
+    # build the report once, it is printed to the console and written out to a log file for future review
+    report = [f"Data collected for {duration}.",
+              f"Collected {length} records.",
+              f"Records cover an estimated {duration_from_length} at {sample_rate.total_seconds()} sample rate.",
+              "",
+              f"Solar flux smoothed with a {smoothing} second moving average.",
+              f"Survey UTC Start Time: {start_time}",
+              f"Survey UTC End Time: {end_time}",
+              f"Solar UTC Start Time: {utc_start_time}",
+              f"Solar UTC End Time: {utc_end_time}",
+              f"Solar Local Start Time: {local_start_time}",
+              f"Solar Local End Time: {local_end_time}",
+              "",
+              f"Average photon flux: {average_photon_flux} micromoles",
+              f"Photon flux StDev: {stdev_photon_flux} micromoles",
+              f"Median photon flux: {median_photon_flux} micromoles",
+              f"Minimum photon flux: {min_photon_flux} micromoles",
+              f"Maximum photon flux: {max_photon_flux} micromoles",
+              ""]
+
+    # warnings are kept as (warning, detail) so the console can highlight the warning itself
+    warnings = []
     if time_difference >= pd.Timedelta(minutes=10):
-        print(Fore.RED + f"WARNING! Potential data recording error"
-              + Style.RESET_ALL + f" discrepancy of {time_difference} between record count and start/stop times.")
+        warnings.append(("WARNING! Potential data recording error",
+                         f" discrepancy of {time_difference} between record count and start/stop times."))
     if zero_value_records > 30:
-        print(Fore.RED + f"WARNING! Potential data recording error"
-              + Style.RESET_ALL + f" for {zero_value_records} records.")
+        warnings.append(("WARNING! Potential data recording error", f" for {zero_value_records} records."))
     if low_value_records > 30:
-        print(Fore.RED + f"WARNING! Low solar irradiance detected"
-              + Style.RESET_ALL + f" for {low_value_records} records.")
+        warnings.append(("WARNING! Low solar irradiance detected", f" for {low_value_records} records."))
     if high_value_records > 30:
-        print(Fore.RED + "WARNING! High solar irradiance detected"
-              + Style.RESET_ALL + f" for {high_value_records} records.")
+        warnings.append(("WARNING! High solar irradiance detected", f" for {high_value_records} records."))
     if start_time:
-        print(Fore.RED + f"{start_time_warning}" + Style.RESET_ALL)
+        warnings.append((start_time_warning, ""))
     if end_time:
-        print(Fore.RED + f"{end_time_warning}"+ Style.RESET_ALL)
+        warnings.append((end_time_warning, ""))
+
+    print(Fore.YELLOW + "\n\n### Solar Probe Statistics ###\n")
+    print(Style.RESET_ALL + "\n".join(report
+                                      + [Fore.RED + warning + Style.RESET_ALL + detail for warning, detail in warnings]))
 
     with open(output_stats, mode='w') as f:
-        # write out stats to a log file for future review
-        f.writelines(f"### Solar Probe Statistics ###\n\n")
-        f.writelines(f"Data collected for {duration}.\n")
-        f.writelines(f"Collected {length} records.\n")
-        f.writelines(f"Records cover an estimated {duration_from_length} at {sample_rate.total_seconds()} sample rate.\n\n")
-        f.writelines(f"Solar flux smoothed with a {smoothing} second moving average.\n")
-        f.writelines(f"Survey UTC Start Time: {start_time}\n")
-        f.writelines(f"Survey UTC End Time: {end_time}\n")
-        f.writelines(f"Solar UTC Start Time: {utc_start_time}\n")
-        f.writelines(f"Solar UTC End Time: {utc_end_time}\n")
-        f.writelines(f"Solar Local Start Time: {local_start_time}\n")
-        f.writelines(f"Solar Local End Time: {local_end_time}\n\n")
-        f.writelines(f"Average photon flux: {average_photon_flux} micromoles\n")
-        f.writelines(f"Photon flux StDev: {stdev_photon_flux} micromoles\n")
-        f.writelines(f"Median photon flux: {median_photon_flux} micromoles\n")
-        f.writelines(f"Minimum photon flux: {min_photon_flux} micromoles\n")
-        f.writelines(f"Maximum photon flux: {max_photon_flux} micromoles\n\n")
-
-        if time_difference >= pd.Timedelta(minutes=10):
-            f.writelines(Fore.RED + f"WARNING! Potential data recording error"
-                  + Style.RESET_ALL + f" discrepancy of {time_difference} between record count and start/stop times.\n")
-        if zero_value_records > 30:
-            f.writelines(f"WARNING! Potential data recording error"
-                         f" for {zero_value_records} records.\n")
-        if low_value_records > 30:
-            f.writelines(f"WARNING! Low solar irradiance detected"
-                         f" for {low_value_records} records.\n")
-        if high_value_records > 30:
-            f.writelines("WARNING! High solar irradiance detected"
-                         f" for {high_value_records} records.\n")
-        if start_time:
-            f.writelines(f"{start_time_warning}\n")
-        if end_time:
-            f.writelines(f"{end_time_warning}\n")
+        f.write("### Solar Probe Statistics ###\n\n"
+                + "\n".join(report + [warning + detail for warning, detail in warnings]) + "\n")
 
     # generate timeseries plot
-    fig, ax = plt.subplots()
-    raw_solar_df.plot(x="LocalTime", y="MicroMoles", title=basename(solar_file) + " Timeseries", ax=ax, figsize=(15,10))
+    fig, ax = plt.subplots(figsize=(15, 10))
+    ax.plot(raw_solar_df["LocalTime"].to_numpy(), raw_solar_df["MicroMoles"].to_numpy(), label="MicroMoles")
+    ax.set_title(basename(solar_file) + " Timeseries")
+    ax.legend()
     ax.set_xlabel("Local Time")
     ax.set_ylabel("Solar Irradiation")
     # reference line at 600 micromoles
     ax.axhline(y=600, xmin=0, xmax=1, linestyle='--', color='purple')
-    plt.savefig(timeseries_plot, bbox_inches='tight', format='png', dpi=900)
+    fig.savefig(timeseries_plot, bbox_inches='tight', format='png', dpi=dpi)
     plt.close(fig)
 
     # TODO: fix the stats logging
@@ -325,14 +317,15 @@ def main():
                                                                     recursive=args.recursive,
                                                                     file_list=True)
         args.logger.info(f"\nProcessing {file_count} solar files totalling {round(total_size,2)} GB.")
-        for file_path in file_paths:
-            duration, utc_start_time, utc_end_time, output_stats, timeseries_plot = \
-                solar_to_stats(file_path,
-                               out_dir=args.out_dir,
-                               utc_offset=args.utc_offset,
-                               start_time=args.start_time,
-                               end_time=args.end_time,
-                               smoothing=args.smoothing)
+        # the files are independent, so each one is processed in its own worker process
+        with ProcessPoolExecutor() as executor:
+            list(executor.map(partial(solar_to_stats,
+                                      out_dir=args.out_dir,
+                                      utc_offset=args.utc_offset,
+                                      start_time=args.start_time,
+                                      end_time=args.end_time,
+                                      smoothing=args.smoothing),
+                              file_paths))
     # else run the qc on the input file
     else:
         duration, utc_start_time, utc_end_time, output_stats, timeseries_plot = \
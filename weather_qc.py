@@ -1,12 +1,19 @@
 import sys
+import os
 import numpy as np
+import pandas as pd
 from os import listdir
 from os.path import dirname, realpath, basename, splitext, join, isfile
 import math
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from colorama import init, Fore, Style
+import matplotlib
 import matplotlib.pyplot as plt
 
+# set a headless plotting backend, the plots are only saved to file
+matplotlib.use('Agg')
+
 # tell python to search for modules from other parts of the bridge team scripts folder
 cwd = dirname(realpath(__file__))
 sys.path.insert(1, cwd)
@@ -24,13 +31,23 @@ __version__ = "0.0.2"
 # aimms processing directory
 AIMMS_EXE_DIR = join(cwd, "aimms_exe")
 
+# leading records used to estimate the aimms sample rate
+SAMPLE_RATE_RECORDS = 1024
+
+# instrument columns that fit comfortably in single precision, positions stay double for the kml
+SINGLE_PRECISION_COLUMNS = ['Uw', 'Vw', 'Temp', 'RH', 'P_stat']
+
+# date that bare times are placed on for the aimms and lidar comparison, the strptime default
+COMPARISON_DATE = datetime(1900, 1, 1).date()
+
 
 def weather_to_stats(aimms_df,
                      weather_stats,
                      wind_smoothing=20,
                      temp_smoothing=10,
                      pressure_smoothing=10,
-                     relhumid_smoothing=10):
+                     relhumid_smoothing=10,
+                     dpi=200):
     """
     Required Arguments
     ----------
@@ -49,6 +66,8 @@ def weather_to_stats(aimms_df,
         Period over which to apply a moving average to smooth the data.
     relhumid_smoothing : int
         Period over which to apply a moving average to smooth the data.
+    dpi : int
+        Resolution of the saved timeseries plots. Defaults to 200.
 
     Returns
     -------
@@ -60,32 +79,46 @@ def weather_to_stats(aimms_df,
         The utc end time of the collection.
     """
 
-    # smooth the data
-    aimms_df["Uw"] = aimms_df["Uw"].rolling(window=wind_smoothing).mean()
-    aimms_df["Vw"] = aimms_df["Vw"].rolling(window=wind_smoothing).mean()
-    aimms_df["Temp"] = aimms_df["Temp"].rolling(window=temp_smoothing).mean()
-    aimms_df["RH"] = aimms_df["RH"].rolling(window=relhumid_smoothing).mean()
-    aimms_df["P_stat"] = aimms_df["P_stat"].rolling(window=pressure_smoothing).mean()
+    # smooth the data, columns sharing a window are smoothed together in one rolling pass
+    smoothing_windows = {}
+    for column, window in (("Uw", wind_smoothing),
+                           ("Vw", wind_smoothing),
+                           ("Temp", temp_smoothing),
+                           ("RH", relhumid_smoothing),
+                           ("P_stat", pressure_smoothing)):
+        smoothing_windows.setdefault(window, []).append(column)
+    for window, columns in smoothing_windows.items():
+        # the rolling mean accumulates in double precision, the result goes back to the columns' precision
+        aimms_df[columns] = aimms_df[columns].rolling(window=window).mean().astype(aimms_df[columns].dtypes)
+
+    # pull each column out as an array once, the stats, wind speed and error counts all work on the arrays
+    time = aimms_df['Time'].to_numpy()
+    uw = aimms_df['Uw'].to_numpy()
+    vw = aimms_df['Vw'].to_numpy()
+    temp = aimms_df['Temp'].to_numpy()
+    relhumid = aimms_df['RH'].to_numpy()
+    pressure = aimms_df['P_stat'].to_numpy()
 
     # timing
-    duration = aimms_df['Time'].iloc[-1] - aimms_df['Time'].iloc[0]
-    length = len(aimms_df['Time'].index)
-    utc_start_time = aimms_df['Time'].iloc[0].time()
-    utc_end_time = aimms_df['Time'].iloc[-1].time()
-    
+    duration = pd.Timedelta(time[-1] - time[0])
+    length = len(time)
+    utc_start_time = pd.Timestamp(time[0]).time()
+    utc_end_time = pd.Timestamp(time[-1]).time()
+
     # temp, pressure, and humidty
-    average_temp = round(aimms_df['Temp'].mean(), 3)
-    variance_temp = round(aimms_df['Temp'].std(), 3)
-    average_pstat = round(aimms_df['P_stat'].mean(), 3)
-    variance_pstat = round(aimms_df['P_stat'].std(), 3)
-    average_relhumid = round(100 * aimms_df['RH'].mean(), 3)
-    variance_relhumid = round(100 * aimms_df['RH'].std(), 3)
-
-    # compute wind speed from components
-    vect_combined_components = np.vectorize(combined_components)
-    aimms_df['Computed_WS'] = vect_combined_components(aimms_df['Uw'], aimms_df['Vw'])
-    average_wspeed = round(aimms_df['Computed_WS'].mean(), 3)
-    variance_wspeed = round(aimms_df['Computed_WS'].std(), 3)
+    # full precision is kept, the stats are rounded when they are reported. nan is skipped like pandas
+    average_temp = np.nanmean(temp, dtype=np.float64)
+    variance_temp = np.nanstd(temp, ddof=1, dtype=np.float64)
+    average_pstat = np.nanmean(pressure, dtype=np.float64)
+    variance_pstat = np.nanstd(pressure, ddof=1, dtype=np.float64)
+    average_relhumid = 100 * np.nanmean(relhumid, dtype=np.float64)
+    variance_relhumid = 100 * np.nanstd(relhumid, ddof=1, dtype=np.float64)
+
+    # compute wind speed from components, the array version of combined_components
+    wind_speed = np.round(np.hypot(uw, vw), 6)
+    aimms_df['Computed_WS'] = wind_speed
+    average_wspeed = np.nanmean(wind_speed, dtype=np.float64)
+    variance_wspeed = np.nanstd(wind_speed, ddof=1, dtype=np.float64)
 
     print(Fore.YELLOW + "\n\n### AIMMS Probe Statistics ###\n")
    
@@ -95,158 +128,161 @@ def weather_to_stats(aimms_df,
     print(f"UTC Start Time: {utc_start_time}")
     print(f"UTC End Time: {utc_end_time}\n")
     
-    print(f"Average temperature: {average_temp} C")
-    print(f"Temperature StDev: {variance_temp} C")
-    print(f"Average pressure: {average_pstat} pascals")
-    print(f"Pressure StDev: {variance_pstat} pascals")
-    print(f"Average Wind Speed: {average_wspeed} m/sec")
-    print(f"Wind Speed StDev: {variance_wspeed} m/sec")
-    print(f"Average Rel Humidity: {average_relhumid} %")
-    print(f"Rel Humidity StDev: {variance_relhumid} %")
+    print(f"Average temperature: {average_temp:.3f} C")
+    print(f"Temperature StDev: {variance_temp:.3f} C")
+    print(f"Average pressure: {average_pstat:.3f} pascals")
+    print(f"Pressure StDev: {variance_pstat:.3f} pascals")
+    print(f"Average Wind Speed: {average_wspeed:.3f} m/sec")
+    print(f"Wind Speed StDev: {variance_wspeed:.3f} m/sec")
+    print(f"Average Rel Humidity: {average_relhumid:.3f} %")
+    print(f"Rel Humidity StDev: {variance_relhumid:.3f} %")
     
     
+    # count the error records straight off the arrays rather than filtering out dataframes to count
     # zero wind speed errors if they exceed more than 1 minute
-    error_zero_ws_df = aimms_df.loc[aimms_df['Computed_WS'] == 0]
-    error_zero_ws_length = round(len(error_zero_ws_df['Time'].index)/60, 1)
+    error_zero_ws_length = round(np.count_nonzero(wind_speed == 0)/60, 1)
     if error_zero_ws_length > 1:
         print(Fore.RED + "WARNING! Potential windspeed recording error " + Style.RESET_ALL
               + f"of 0 m/sec for {error_zero_ws_length} minutes.")
     
     # high wind speed errors they exceed more than 1 minute
-    error_high_ws_df = aimms_df.loc[aimms_df['Computed_WS'] > 27.0]
-    error_high_ws_length = round(len(error_high_ws_df['Time'].index)/60, 1)
+    error_high_ws_length = round(np.count_nonzero(wind_speed > 27.0)/60, 1)
     if error_high_ws_length > 1:
         print(Fore.RED + "WARNING! Potential windspeed recording error " + Style.RESET_ALL
               + f"of >27 m/sec for {error_high_ws_length} minutes.")
 
     # temperature errors if they exceed more than 1 minute
-    error_temp_df = aimms_df.loc[aimms_df['Temp'] == 0]
-    error_zero_temp_length = round(len(error_temp_df['Time'].index)/60, 1)
+    error_zero_temp_length = round(np.count_nonzero(temp == 0)/60, 1)
     if error_zero_temp_length > 1:
         print(Fore.RED + "WARNING! Potential data recording error " + Style.RESET_ALL
               + f"of 0 temperature for {error_zero_temp_length} minutes.")
 
-    error_temp_df = aimms_df.loc[aimms_df['Temp'] >= 120]
-    error_high_temp_length = round(len(error_temp_df['Time'].index) / 60, 1)
+    error_high_temp_length = round(np.count_nonzero(temp >= 120)/60, 1)
     if error_high_temp_length > 1:
         print(Fore.RED + "WARNING! Potential data recording error " + Style.RESET_ALL
               + f"of >120 temperature for {error_high_temp_length} minutes.")
 
     # pressure errors if they exceed more than 1 minute
-    error_pressure_df = aimms_df.loc[aimms_df['P_stat'] == 0]
-    error_zero_pressure_length = round(len(error_pressure_df['Time'].index)/60, 1)
+    error_zero_pressure_length = round(np.count_nonzero(pressure == 0)/60, 1)
     if error_zero_pressure_length > 1:
         print(Fore.RED + "WARNING! Potential data recording error " + Style.RESET_ALL
               + f"of 0 pressure for {error_zero_pressure_length} minutes.")
 
-    error_pressure_df = aimms_df.loc[aimms_df['P_stat'] >= 108380]
-    error_high_pressure_length = round(len(error_pressure_df['Time'].index)/60, 1)
+    error_high_pressure_length = round(np.count_nonzero(pressure >= 108380)/60, 1)
     if error_high_pressure_length > 1:
         print(Fore.RED + "WARNING! Potential data recording error " + Style.RESET_ALL
-              + f"of >10838 pressure for {error_high_pressure_length} minutes.")
+              + f"of >108380 pressure for {error_high_pressure_length} minutes.")
+
+    # write out stats to a log file for future review, the report is built up and written in one go
+    report = ["####### AIMMS Data QC #########",
+              "",
+              f"Wind data smoothed with a {wind_smoothing} period moving average.",
+              f"Temp data smoothed with a {temp_smoothing} period moving average.",
+              f"Humidity data smoothed with a {relhumid_smoothing} period moving average.",
+              f"Pressure data smoothed with a {pressure_smoothing} period moving average.",
+              f"Data collected for {duration} hours.",
+              f"Collected {length} records.",
+              "",
+              f"UTC Start Time: {utc_start_time}",
+              f"UTC End Time: {utc_end_time}",
+              "",
+              f"Average temperature: {average_temp:.3f} C",
+              f"Temperature StDev: {variance_temp:.3f} C",
+              f"Average pressure: {average_pstat:.3f} pascals",
+              f"Pressure StDev: {variance_pstat:.3f} pascals",
+              f"Average Wind Speed: {average_wspeed:.3f} m/sec",
+              f"Wind Speed StDev: {variance_wspeed:.3f} m/sec",
+              f"Average Rel Humidity: {average_relhumid:.3f} %",
+              f"Rel Humidity StDev: {variance_relhumid:.3f} %",
+              ""]
 
-    with open(weather_stats, mode='w') as f:
-        # write out stats to a log file for future review
-        
-        f.writelines("####### AIMMS Data QC #########\n\n")
+    if error_zero_ws_length > 1:
+        report += [f"WARNING! Potential windspeed recording error of 0 m/sec for {error_zero_ws_length} minutes.", ""]
+    if error_high_ws_length > 1:
+        report += [f"WARNING! Potential windspeed recording error of >27 m/sec for {error_high_ws_length} minutes.", ""]
+    if error_zero_temp_length > 1:
+        report += [f"WARNING! Potential data recording error of 0 temperature for {error_zero_temp_length} minutes.",
+                   ""]
+    if error_high_temp_length > 1:
+        report += [f"WARNING! Potential data recording error of >120 temperature for {error_high_temp_length} minutes.",
+                   ""]
+    if error_zero_pressure_length > 1:
+        report += [f"WARNING! Potential data recording error of 0 pressure for {error_zero_pressure_length} minutes.",
+                   ""]
+    if error_high_pressure_length > 1:
+        report += [f"WARNING! Potential data recording error of >108380 pressure for {error_high_pressure_length} "
+                   f"minutes.", ""]
 
-        f.writelines(f"Wind data smoothed with a {wind_smoothing} period moving average.\n")
-        f.writelines(f"Temp data smoothed with a {temp_smoothing} period moving average.\n")
-        f.writelines(f"Humidity data smoothed with a {relhumid_smoothing} period moving average.\n")
-        f.writelines(f"Pressure data smoothed with a {pressure_smoothing} period moving average.\n")
+    with open(weather_stats, mode='w') as f:
+        f.write("\n".join(report) + "\n")
+
+    # make some plots, they are independent so each one is rendered in its own worker process
+    plot_stem = splitext(weather_stats)[0]
+    with ProcessPoolExecutor(max_workers=min(6, os.cpu_count() or 1)) as executor:
+        plots = [
+            # timeseries plot for temperature, reference line at 20 degrees celsius
+            executor.submit(plot_timeseries, plot_stem + "_temp_timeseries.png",
+                            time, temp, "Temp", "Temperature deg C", [(20, 'purple')], dpi),
+            # timeseries plot for wind speed, reference lines at 6.7 m/s (15 mph) and 27 m/s (60 mph)
+            executor.submit(plot_timeseries, plot_stem + "_windspeed_timeseries.png",
+                            time, wind_speed, "Computed_WS", "Wind Speed m/s", [(6.7, 'purple'), (27, 'red')], dpi),
+            # timeseries plot for pressure, reference line at 90k
+            executor.submit(plot_timeseries, plot_stem + "_pressure_timeseries.png",
+                            time, pressure, "P_stat", "Pressure (Pa)", [(90_000, 'purple')], dpi),
+            # timeseries plot for relative humidity
+            executor.submit(plot_timeseries, plot_stem + "_humidity_timeseries.png",
+                            time, relhumid, "RH", "Humidity %", [], dpi),
+            # spatial plot for windspeed, only the plotted columns are sent to the worker
+            executor.submit(plot_windspeed_errors, aimms_df[["Long", "Lat", "Computed_WS"]],
+                            plot_stem + "_georef_windspeed.png"),
+            # altitude plot
+            executor.submit(plot_timeseries, plot_stem + "_altitude_timeseries.png",
+                            time, aimms_df['Z'].to_numpy(), "Z", "MSL Altitude", [], dpi),
+        ]
+        # raise any plotting errors here
+        for plot in plots:
+            plot.result()
 
-        f.writelines(f"Data collected for {duration} hours.\n")
-        f.writelines(f"Collected {length} records.\n\n")
-    
-        f.writelines(f"UTC Start Time: {utc_start_time}\n")
-        f.writelines(f"UTC End Time: {utc_end_time}\n\n")
-    
-        f.writelines(f"Average temperature: {average_temp} C\n")
-        f.writelines(f"Temperature StDev: {variance_temp} C\n")
-        f.writelines(f"Average pressure: {average_pstat} pascals\n")
-        f.writelines(f"Pressure StDev: {variance_pstat} pascals\n")
-        f.writelines(f"Average Wind Speed: {average_wspeed} m/sec\n")
-        f.writelines(f"Wind Speed StDev: {variance_wspeed} m/sec\n")
-        f.writelines(f"Average Rel Humidity: {average_relhumid} %\n")
-        f.writelines(f"Rel Humidity StDev: {variance_relhumid} %\n\n")
-
-        if error_zero_ws_length > 1:
-            f.writelines(f"WARNING! Potential windspeed recording error of 0 m/sec for {error_zero_ws_length} minutes.\n\n")
-        if error_high_ws_length > 1:
-            f.writelines(f"WARNING! Potential windspeed recording error of >27 m/sec for {error_high_ws_length} minutes.\n\n")
-        if error_zero_temp_length > 1:
-            f.writelines(f"WARNING! Potential data recording error of 0 temperature for {error_zero_temp_length} minutes.\n\n")
-        if error_high_temp_length > 1:
-            f.writelines(f"WARNING! Potential data recording error of >120 temperature for {error_high_temp_length} minutes.\n\n")
-        if error_zero_pressure_length > 1:
-            f.writelines(f"WARNING! Potential data recording error of 0 pressure for {error_zero_pressure_length} minutes.\n\n")
-        if error_high_pressure_length > 1:
-            f.writelines(f"WARNING! Potential data recording error of >108380 pressure for {error_high_pressure_length} minutes.\n\n")
-
-    # make some plots
-
-    # generate timeseries plot for temperature
-    fig, ax = plt.subplots()
-    plot_name = splitext(weather_stats)[0] + "_temp_timeseries.png"
-    aimms_df.plot(x="Time", y="Temp", title=basename(plot_name), ax=ax, figsize=(15,10))
-    ax.set_xlabel("UTC Time")
-    ax.set_ylabel("Temperature deg C")
-    # reference line at 20 degrees celsius
-    ax.axhline(y=20, xmin=0, xmax=1, linestyle='--', color='purple')
-    plt.savefig(plot_name, bbox_inches='tight', format='png', dpi=900)
-    plt.close(fig)
+    # TODO: create more spatial plots or attributed shapefiles
 
-    # generate timeseries plot for wind speed
-    fig, ax = plt.subplots()
-    plot_name = splitext(weather_stats)[0] + "_windspeed_timeseries.png"
-    aimms_df.plot(x="Time", y="Computed_WS", title=basename(plot_name), ax=ax, figsize=(15,10))
-    ax.set_xlabel("UTC Time")
-    ax.set_ylabel("Wind Speed m/s")
-    # reference line at 6.7 m/s (15 mph)
-    ax.axhline(y=6.7, xmin=0, xmax=1, linestyle='--', color='purple')
-    # reference line at 27 m/s (60 mph)
-    ax.axhline(y=27, xmin=0, xmax=1, linestyle='--', color='red')
-    plt.savefig(plot_name, bbox_inches='tight', format='png', dpi=900)
-    plt.close(fig)
+    return duration, utc_start_time, utc_end_time
 
-    # generate timeseries plot for pressure
-    fig, ax = plt.subplots()
-    plot_name = splitext(weather_stats)[0] + "_pressure_timeseries.png"
-    aimms_df.plot(x="Time", y="P_stat", title=basename(plot_name), ax=ax, figsize=(15,10))
-    ax.set_xlabel("UTC Time")
-    ax.set_ylabel("Pressure (Pa)")
-    # reference line at 90k
-    ax.axhline(y=90_000, xmin=0, xmax=1, linestyle='--', color='purple')
-    plt.savefig(plot_name, bbox_inches='tight', format='png', dpi=900)
-    plt.close(fig)
 
-    # generate timeseries plot for relative humidity
-    fig, ax = plt.subplots()
-    plot_name = splitext(weather_stats)[0] + "_humidity_timeseries.png"
-    aimms_df.plot(x="Time", y="RH", title=basename(plot_name), ax=ax, figsize=(15,10))
-    ax.set_xlabel("UTC Time")
-    ax.set_ylabel("Humidity %")
-    plt.savefig(plot_name, bbox_inches='tight', format='png', dpi=900)
-    plt.close(fig)
+def plot_timeseries(plot_name, time, values, label, ylabel, reference_lines=(), dpi=200):
+    """ Save a timeseries plot of one aimms column against utc time.
 
-    # generate spatial plot for windspeed
-    plot_windspeed_errors(aimms_df, splitext(weather_stats)[0] + "_georef_windspeed.png")
+    Required Parameters
+    ----------
+    plot_name : str
+        The output plot file.
+    time : ndarray
+        The utc timestamps.
+    values : ndarray
+        The values to plot.
+    label : str
+        The legend label for the values, generally the column name.
+    ylabel : str
+        The y axis label.
 
-    # altitude plot
-    fig, ax = plt.subplots()
-    plot_name = splitext(weather_stats)[0] + "_altitude_timeseries.png"
-    aimms_df.plot(x="Time", y="Z", title=basename(plot_name), ax=ax, figsize=(15,10))
+    Optional Parameters
+    ----------
+    reference_lines : list[tuple[float, str]]
+        Dashed horizontal reference lines as (y, color) pairs. Defaults to none.
+    dpi : int
+        Resolution of the saved plot. Defaults to 200.
+    """
+    fig, ax = plt.subplots(figsize=(15, 10))
+    ax.plot(time, values, label=label)
+    ax.set_title(basename(plot_name))
+    ax.legend()
     ax.set_xlabel("UTC Time")
-    ax.set_ylabel("MSL Altitude")
-    plt.savefig(plot_name, bbox_inches='tight', format='png', dpi=900)
+    ax.set_ylabel(ylabel)
+    for y, color in reference_lines:
+        ax.axhline(y=y, xmin=0, xmax=1, linestyle='--', color=color)
+    fig.savefig(plot_name, bbox_inches='tight', format='png', dpi=dpi)
     plt.close(fig)
 
 
-    # TODO: create more spatial plots or attributed shapefiles
-
-    return duration, utc_start_time, utc_end_time
-
-
 def combined_components(x, y, precision=6):
     """ Linear combination of two orthogonal variables
 
@@ -267,7 +303,7 @@ def combined_components(x, y, precision=6):
     r : float
         The linear combination of x and y, generally interpreted as a 2D radius.
     """
-    r = round(math.sqrt(math.pow(x,2) + math.pow(y,2)), 6)
+    r = round(math.hypot(x, y), precision)
 
     return r
 
@@ -303,16 +339,10 @@ def check_weather_data(aimms_file, solar, mission_csv, out_dir, utc_offset, per_
     init()
 
     # setup some names
-    file_name = basename(aimms_file)
-    name, ext = splitext(file_name)
+    name = splitext(basename(aimms_file))[0]
     if out_dir is None:
         out_dir = dirname(aimms_file)
     kml_file = join(out_dir, name + '.kml')
-
-    weatherfilename = basename(aimms_file)
-    name, ext = splitext(weatherfilename)
-
-
     weather_stats = join(out_dir, name + '_weather_statistics.txt')
 
     # extract the data if it is a .RAW binary data file
@@ -325,20 +355,29 @@ def check_weather_data(aimms_file, solar, mission_csv, out_dir, utc_offset, per_
 
     # read the aimms data into a dataframe
     raw_weather_df = aimms_to_df(aimms_file)
+    # single precision halves the memory the smoothing, stats and plots work through
+    raw_weather_df = raw_weather_df.astype(dict.fromkeys(SINGLE_PRECISION_COLUMNS, np.float32))
 
     # make a reference kml
     aimms_to_kml(raw_weather_df, kml_file)
 
     # convert smoothing periods to time intervals
 
-    # estimate sample rate:
-    sample_rate = raw_weather_df['Time'].diff().median()
+    # estimate sample rate, the median interval of the first records is enough for the steady probe rate
+    # and isn't thrown off by a gap or the midnight rollover the way a first/last estimate would be:
+    # the timestamps are brought to nanoseconds first so the integer differences are in a known unit
+    time_ns = raw_weather_df['Time'].to_numpy()[:SAMPLE_RATE_RECORDS + 1].astype("datetime64[ns]").view(np.int64)
+    sample_rate = pd.Timedelta(np.median(np.diff(time_ns)), unit="ns")
     # TODO: fix utc midnight issue where plot is split and second part of the flight is plotted before the first part.
     print(f"Detected median aimms sample rate: {sample_rate.total_seconds()} seconds")
-    wind_smoothing = int(wind_smoothing / sample_rate.total_seconds())
-    temp_smoothing = int(temp_smoothing / sample_rate.total_seconds())
-    pressure_smoothing = int(pressure_smoothing / sample_rate.total_seconds())
-    relhumid_smoothing = int(relhumid_smoothing / sample_rate.total_seconds())
+    # a period shorter than one sample would give an empty rolling window, so it smooths over a single record
+    sample_seconds = sample_rate.total_seconds()
+    if min(wind_smoothing, temp_smoothing, pressure_smoothing, relhumid_smoothing) < sample_seconds:
+        print(f"Smoothing periods under the {sample_seconds} second sample rate are applied over a single record.")
+    wind_smoothing = max(1, int(wind_smoothing / sample_seconds))
+    temp_smoothing = max(1, int(temp_smoothing / sample_seconds))
+    pressure_smoothing = max(1, int(pressure_smoothing / sample_seconds))
+    relhumid_smoothing = max(1, int(relhumid_smoothing / sample_seconds))
 
     # compute the start/stop and duration and generate statistics
     duration, utc_start_time, utc_end_time = weather_to_stats(raw_weather_df,
@@ -351,10 +390,11 @@ def check_weather_data(aimms_file, solar, mission_csv, out_dir, utc_offset, per_
     if mission_csv and isfile(mission_csv):
         lidar_start_time, lidar_end_time = get_times_from_mission_csv(mission_csv)
 
-        utc_start_time_datetime = datetime.strptime(str(utc_start_time), '%H:%M:%S')
+        # the aimms times are already time objects, they go on the same date strptime gives the lidar times
+        utc_start_time_datetime = datetime.combine(COMPARISON_DATE, utc_start_time)
         lidar_start_time_datetime = datetime.strptime(str(lidar_start_time), '%H:%M:%S.%f')
 
-        utc_end_time_datetime = datetime.strptime(str(utc_end_time), '%H:%M:%S')
+        utc_end_time_datetime = datetime.combine(COMPARISON_DATE, utc_end_time)
         lidar_end_time_datetime = datetime.strptime(str(lidar_end_time), '%H:%M:%S.%f')
 
         with open(weather_stats, mode='a') as f: